@@ -1,23 +1,143 @@
 import argparse
+import copy
+import json
 import os
+import shutil
+import subprocess
 import sys
-from pymkv import MKVFile, MKVTrack
-import ffmpeg
+import tempfile
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from functools import lru_cache
+from operator import itemgetter
 import iso639
 
+# pymkv, ffmpeg and ebmlite are imported where used, ffmpeg and ebmlite are then only loaded on ffmpeg fallback
+
+# Language tags meaning the track language is undetermined
+_UND = frozenset({"und", "", None})
+
+# Key identifying the state of a file on disk, so cached metadata is dropped when the file changes
+def _stat_key(path):
+    return (os.path.getmtime(path), os.path.getsize(path))
+
+# Parse MKV file only once per file state, as each MKVFile construction spawns mkvmerge
+# Tracks are indexed by language in the same pass, so language queries on the cached file are dict lookups
+@lru_cache(maxsize=32)
+def _load_mkv(mkv_file, stat_key):
+    from pymkv import MKVFile
+    mkv = MKVFile(mkv_file)
+    mkv._audio_by_lang = defaultdict(list)
+    mkv._subs_by_lang = defaultdict(list)
+    mkv._und_audio = []
+    for track in mkv.get_track():
+        if track.track_type == "audio":
+            mkv._audio_by_lang[_lang_match(track.language)].append(track)
+            if track.language in _UND:
+                mkv._und_audio.append(track)
+        elif track.track_type == "subtitles":
+            mkv._subs_by_lang[_lang_match(track.language)].append(track)
+    return mkv
+
+# Build static map of iso639 codes to languages, following Language.match priority
+def _build_lang_codes():
+    lang_codes = {}
+    active_languages = [language for language in iso639.ALL_LANGUAGES if language.status == "A"]
+    for part in ("part3", "part2b", "part2t", "part1"):
+        for language in active_languages:
+            code = getattr(language, part)
+            if code:
+                lang_codes.setdefault(code, language)
+    for language in iso639.ALL_LANGUAGES:
+        lang_codes.setdefault(language.part3, language)
+    return lang_codes
+
+_LANG_CODES = _build_lang_codes()
+
+# Match language code to iso639 language, cached as the same few codes are matched for every track
+# Codes found in MKV tags are resolved from the static map, other inputs go through Language.match
+# Codes unknown to iso639 but accepted by mkvmerge (e.g. collective codes like 'sgn') match no language
+@lru_cache(maxsize=256)
+def _lang_match(code):
+    if not code:
+        return None
+    try:
+        return _LANG_CODES.get(code) or _LANG_CODES.get(code.lower()) or iso639.Language.match(code)
+    except iso639.LanguageNotFoundError:
+        return None
+
+# Probe file only once per file state, as each probe spawns ffprobe
+# Stream analysis is limited to the first second, container headers already hold the needed stream properties
+# Only errors are logged, keeping captured stderr small
+@lru_cache(maxsize=128)
+def _probe(input_file, stat_key):
+    import ffmpeg
+    return ffmpeg.probe(input_file, probesize="1M", analyzeduration="1M", hide_banner=None, v="error")
+
+# Matroska codec IDs mapped to the codec names reported by ffprobe
+_MATROSKA_CODECS = {
+    "A_AAC": "aac",
+    "A_AC3": "ac3",
+    "A_EAC3": "eac3",
+    "A_DTS": "dts",
+    "A_TRUEHD": "truehd",
+    "A_OPUS": "opus",
+    "A_VORBIS": "vorbis",
+    "A_FLAC": "flac",
+    "A_ALAC": "alac",
+    "A_MPEG/L2": "mp2",
+    "A_MPEG/L3": "mp3",
+}
+
+# Audio tracks information of a file, stored as one list per field
+# idx is only used for display, ffmpeg streams are mapped with stream_index
+@dataclass
+class AudioTracksInfo:
+    indices: list = field(default_factory=list)
+    stream_indices: list = field(default_factory=list)
+    codec_names: list = field(default_factory=list)
+    channels: list = field(default_factory=list)
+    sample_rates: list = field(default_factory=list)
+    bit_rates: list = field(default_factory=list)
+    languages: list = field(default_factory=list)
+
+    def __len__(self):
+        return len(self.indices)
+
+    def add_track(self, stream_index, codec_name, channels, sample_rate, bit_rate, language):
+        self.indices.append(len(self.indices))
+        self.stream_indices.append(stream_index)
+        self.codec_names.append(codec_name)
+        self.channels.append(channels)
+        self.sample_rates.append(sample_rate)
+        self.bit_rates.append(bit_rate)
+        self.languages.append(language)
+
+    # Rebuild information dict of the track at given row
+    def track(self, row):
+        return {
+            "idx": self.indices[row],
+            "stream_index": self.stream_indices[row],
+            "codec_name": self.codec_names[row],
+            "channels": self.channels[row],
+            "sample_rate": self.sample_rates[row],
+            "bit_rate": self.bit_rates[row],
+            "language": self.languages[row]
+        }
+
 # Extract audio tracks from video file using ffmpeg if the pymkv fails
-def extract_audio_ffmpeg(video_file, language, output_ext="aac", default_bitrate=196000, max_bitrate=320000):
-    filename, ext = os.path.splitext(video_file)
+def extract_audio_ffmpeg(video_file, language, output_ext="aac", default_bitrate=196000, max_bitrate=320000, copy_if_possible=False):
+    filename = os.path.splitext(video_file)[0]
     audio_tracks = get_audio_tracks_info(video_file)
     if not audio_tracks:
         print("No audio tracks found in input file.")
         return []
     print(f"Found {len(audio_tracks)} audio track(s) in input file:")
-    tracks_lang_map = {track['idx']: track['language'] for track in audio_tracks}
-    for idx, lang_code in tracks_lang_map.items():
+    for idx, lang_code in zip(audio_tracks.indices, audio_tracks.languages):
         print(f"    Track {idx}: Language = {lang_code}")
     
-    selected_tracks = select_audio_tracks_to_extract(audio_tracks, language)
+    selected_tracks = [audio_tracks.track(row) for row in select_audio_tracks_to_extract(audio_tracks, language)]
     if not selected_tracks:
         print(f"No audio suitable tracks found for language '{language.name}'. Exiting.")
         return []
@@ -25,13 +145,28 @@ def extract_audio_ffmpeg(video_file, language, output_ext="aac", default_bitrate
     for track in selected_tracks:
         print(f"    Track {track['idx']}: Language = {track['language']}, Codec = {track['codec_name']}, Channels = {track['channels']}, Sample Rate = {track['sample_rate']}Hz, Bitrate = {track['bit_rate']} bit/s")
     print("Starting conversion...")
+    # Track index is only needed in output file names when several tracks are extracted
+    if len(selected_tracks) > 1:
+        track_file_name = lambda idx, ext: f"{filename}_track{idx}.{ext}"
+    else:
+        track_file_name = lambda idx, ext: f"{filename}.{ext}"
+    # Output never replaces the input file, e.g. a single track copied out of a .mka file
+    def output_file(idx, ext):
+        name = track_file_name(idx, ext)
+        return name if name != video_file else f"{filename}-audio.{ext}"
     for track in selected_tracks:
-        if len(selected_tracks) > 1:
-            track["output_file"] = f"{filename}_track{track['idx']}.{output_ext}"
-        else:
-            track["output_file"] = f"{filename}.{output_ext}"
+        track["output_file"] = output_file(track['idx'], output_ext)
         print(f"    Track {track['idx']}")
-        if track['bit_rate'] == 'N/A':
+        # No bitrate means stream copy, re-encoding to the same codec only costs time and quality
+        if track['codec_name'] == output_ext:
+            print(f"        Input audio codec is already {output_ext}, copying audio stream without re-encoding")
+            audio_bitrate = None
+        elif copy_if_possible and track['codec_name'] != 'N/A':
+            # Matroska audio container accepts any codec and is muxed as is into the video file
+            track["output_file"] = output_file(track['idx'], "mka")
+            print(f"        Copying {track['codec_name']} audio stream without re-encoding to Matroska audio file")
+            audio_bitrate = None
+        elif track['bit_rate'] == 'N/A':
             print(f"        Extracting to audio with default bitrate: {default_bitrate} bits/s")
             audio_bitrate = default_bitrate
         elif int(track['bit_rate']) > max_bitrate:
@@ -40,7 +175,14 @@ def extract_audio_ffmpeg(video_file, language, output_ext="aac", default_bitrate
         else:
             print(f"        Extracting to audio with same audio bitrate as input: {track['bit_rate']} bits/s")
             audio_bitrate = int(track['bit_rate'])  
-        ffmpeg.input(video_file).output(track["output_file"], audio_bitrate=f"{audio_bitrate}").run(overwrite_output=True)
+        track["audio_bitrate"] = audio_bitrate
+    # All selected tracks are written by a single ffmpeg process, so the input file is demuxed only once
+    # Audio only demux needs a single input thread, encoder threads are split between outputs to keep about one thread per core
+    threads = max(1, (os.cpu_count() or 1) // len(selected_tracks))
+    ffmpeg_args = ["-y", "-threads", "1", "-probesize", "1M", "-analyzeduration", "1M", "-i", video_file]
+    for track in selected_tracks:
+        ffmpeg_args.extend(audio_track_output_args(track, threads))
+    _run_ffmpeg(ffmpeg_args)
 
     print("Extraction completed.")
     print("Extracted files:")
@@ -49,146 +191,220 @@ def extract_audio_ffmpeg(video_file, language, output_ext="aac", default_bitrate
     
     return selected_tracks
 
-# Select audio tracks to extract based on preferred language for ffmpeg extraction
+# Build ffmpeg output arguments extracting a single audio track from the input
+def audio_track_output_args(track, threads):
+    if track["audio_bitrate"] is None:
+        codec_args = ["-c:a", "copy"]
+    else:
+        codec_args = ["-b:a", f"{track['audio_bitrate']}"]
+    return ["-map", f"0:{track['stream_index']}", "-vn", "-sn", "-threads", f"{threads}", *codec_args, track["output_file"]]
+
+# Run ffmpeg with given arguments, only errors are logged so stderr never needs to be drained
+# Encoding runs at lower priority where nice is available, keeping the system responsive on long extractions
+def _run_ffmpeg(args):
+    nice_args = ["nice", "-n", "10"] if shutil.which("nice") else []
+    subprocess.run([*nice_args, "ffmpeg", "-nostdin", "-hide_banner", "-loglevel", "error", *args], check=True, stdout=subprocess.DEVNULL)
+
+# Select audio tracks to extract based on preferred language for ffmpeg extraction, returning their rows
 def select_audio_tracks_to_extract(audio_tracks, language):
-    selected_tracks = []
-    for track in audio_tracks:
-        track_lang_iso = iso639.Language.match(track['language'])
-        if track_lang_iso == language:
-            selected_tracks.append(track)
-    
-    if not selected_tracks:
+    selected_rows = [row for row, lang_code in enumerate(audio_tracks.languages) if _lang_match(lang_code) == language]
+    if not selected_rows:
         print(f"No audio tracks found for language '{language.name}'. Assuming tag is missing and exporting the one(s) with N/A.")
-        for track in audio_tracks:
-            if track['language'] == "und":
-                selected_tracks.append(track)
-    return selected_tracks
+        selected_rows = [row for row, lang_code in enumerate(audio_tracks.languages) if lang_code in _UND]
+    return selected_rows
+
+# Matroska element IDs of the header elements holding audio tracks information, as found in SeekHead entries
+_MATROSKA_HEADER_IDS = {b"\x16\x54\xae\x6b": "Tracks", b"\x12\x54\xc3\x67": "Tags"}
+
+# Matroska track types ffmpeg creates a stream for (video, audio, subtitles and metadata)
+_FFMPEG_TRACK_TYPES = frozenset({1, 2, 17, 33})
+
+# Get audio tracks information from Matroska header, without spawning ffprobe
+# Segment children are only walked up to the first Cluster, elements written after the clusters are read
+# through their SeekHead position, so the file body is never scanned
+def get_audio_tracks_info_matroska(input_file):
+    header = {}
+    from ebmlite import loadSchema
+    with loadSchema("matroska.xml").load(input_file) as doc:
+        for segment in doc:
+            if segment.name != "Segment":
+                continue
+            seek_positions = {}
+            for element in segment:
+                if element.name in ("Tracks", "Tags"):
+                    header[element.name] = element.dump()
+                    if len(header) == len(_MATROSKA_HEADER_IDS):
+                        break
+                elif element.name == "SeekHead":
+                    for seek in element.dump().get("Seek", []):
+                        name = _MATROSKA_HEADER_IDS.get(bytes(seek.get("SeekID", b"")))
+                        if name and "SeekPosition" in seek:
+                            seek_positions[name] = seek["SeekPosition"]
+                elif element.name == "Cluster":
+                    break
+            for name, position in seek_positions.items():
+                if name not in header:
+                    segment.stream.seek(segment.payloadOffset + position)
+                    element, _ = segment.parseElement(segment.stream)
+                    if element.name == name:
+                        header[name] = element.dump()
+            break
+    track_entries = header.get("Tracks", {}).get("TrackEntry", [])
+    tags = header.get("Tags", {}).get("Tag", [])
+    # Bitrate is only available as the BPS statistics tag written by mkvmerge
+    bit_rates = {}
+    for tag in tags:
+        for simple_tag in tag.get("SimpleTag", []):
+            if simple_tag.get("TagName") == "BPS":
+                for track_uid in tag.get("Targets", {}).get("TagTrackUID", []):
+                    bit_rates[track_uid] = simple_tag.get("TagString")
+    audio_tracks_info = AudioTracksInfo()
+    # Stream indices follow ffmpeg matroska demuxer, which skips entries with an unsupported type or no codec
+    stream_index = -1
+    for track in track_entries:
+        if track.get("TrackType") not in _FFMPEG_TRACK_TYPES or not track.get("CodecID"):
+            continue
+        stream_index += 1
+        if track.get("TrackType") != 2:
+            continue
+        codec_id = track.get("CodecID", "")
+        audio = track.get("Audio", {})
+        audio_tracks_info.add_track(
+            stream_index=stream_index,
+            codec_name=_MATROSKA_CODECS.get(codec_id) or _MATROSKA_CODECS.get(codec_id.split("/")[0], 'N/A'),
+            channels=audio.get("Channels", 1),
+            sample_rate=f"{int(audio.get('SamplingFrequency', 8000.0))}",
+            bit_rate=bit_rates.get(track.get("TrackUID"), 'N/A'),
+            # Matroska default language when the element is missing
+            language=track.get("Language", "eng")
+        )
+    return audio_tracks_info
 
-# Get audio tracks information from input file using ffmpeg probe
+# Get audio tracks information from input file, using ffmpeg probe for non Matroska files
 def get_audio_tracks_info(input_file):
+    if os.path.splitext(input_file)[1].lower() in (".mkv", ".mka", ".webm"):
+        try:
+            return get_audio_tracks_info_matroska(input_file)
+        except Exception as e:
+            print(f"Error reading Matroska header: {e}")
+            print("Probing file using ffmpeg instead.")
+    import ffmpeg
     try:
-        probe = ffmpeg.probe(input_file)
-        audio_tracks = [s for s in probe['streams'] if s['codec_type'] == 'audio']
-        audio_tracks_info = []
-        for idx, track in enumerate(audio_tracks):
-            info = {
-                "idx": idx,
-                "codec_name": track.get('codec_name', 'N/A'),
-                "channels": track.get('channels', 'N/A'),
-                "sample_rate": track.get('sample_rate', 'N/A'),
-                "bit_rate": track.get('bit_rate', 'N/A'),
-                "language": track['tags']['language'] if 'tags' in track and 'language' in track['tags'] else 'und'
-            }
-            audio_tracks_info.append(info)
-        return audio_tracks_info
+        probe = _probe(input_file, _stat_key(input_file))
+        audio_tracks = [track for track in probe['streams'] if track['codec_type'] == 'audio']
+        return AudioTracksInfo(
+            indices=list(range(len(audio_tracks))),
+            stream_indices=list(map(itemgetter('index'), audio_tracks)),
+            codec_names=[track.get('codec_name', 'N/A') for track in audio_tracks],
+            channels=[track.get('channels', 'N/A') for track in audio_tracks],
+            sample_rates=[track.get('sample_rate', 'N/A') for track in audio_tracks],
+            bit_rates=[track.get('bit_rate', 'N/A') for track in audio_tracks],
+            languages=[(track.get('tags') or {}).get('language', 'und') for track in audio_tracks]
+        )
 
     except ffmpeg.Error as e:
         print("FFmpeg error occurred.")
         print(e.stderr.decode() if e.stderr else str(e))
-        return []
+        return AudioTracksInfo()
+
+    except OSError as e:
+        print(f"Error reading input file: {e}")
+        return AudioTracksInfo()
+
+# Classify MKV file tracks: audio tracks in preferred language (or 'und' ones relabelled as fallback),
+# subtitle tracks in preferred language, and whether audio in preferred language is present
+# Subtitle languages are matched in the same pass as audio ones, so a subtitle code must never fail the audio result
+def classify_tracks(mkv_file, language):
+    mkv = _load_mkv(mkv_file, _stat_key(mkv_file))
+    audio_tracks = [copy.copy(track) for track in mkv._audio_by_lang.get(language, [])]
+    sub_tracks = [copy.copy(track) for track in mkv._subs_by_lang.get(language, [])]
+    has_lang_audio = bool(audio_tracks)
+    if not has_lang_audio:
+        for track in mkv._und_audio:
+            # Overwritting language to desired one, on a copy to keep cached file untouched
+            track = copy.copy(track)
+            track.language = language.part2b
+            track.language_ietf = None
+            audio_tracks.append(track)
+    return audio_tracks, sub_tracks, has_lang_audio
 
-# Extract audio tracks from MKV file using pymkv, fallback to ffmpeg if fails
-def extract_audio(mkv_file, language):
-    selected_tracks = []
+# Extract audio and subtitle tracks from MKV file using pymkv, fallback to ffmpeg for audio if fails
+def extract_tracks(mkv_file, language, copy_if_possible=False):
     try:
-        mkv = MKVFile(mkv_file)
-        mkv_tracks = mkv.get_track()
-        audio_tracks = []
-        for track in mkv_tracks:
-            if track.track_type == "audio":
-                audio_tracks.append(track)
-        for track in audio_tracks:
-            if track.language:
-                if iso639.Language.match(track.language) == language:
-                    selected_tracks.append(track)
-        if not selected_tracks:
+        audio_tracks, sub_tracks, has_lang_audio = classify_tracks(mkv_file, language)
+        if not has_lang_audio:
             print(f"No audio tracks found for language '{language.name}'. Assuming tag is missing and exporting the one(s) with 'und' language.")
-            for track in audio_tracks:
-                if track.language == "und" or not track.language:
-                    # Overwritting language to desired one
-                    track.language = language.part2b
-                    selected_tracks.append(track)
-        return selected_tracks
-    
-    except Exception as e:
-        print(f"Error extracting audio from MKV file: {e}")
-        print(f"Extracting audio using ffmpeg instead.")
-        audio_tracks_ffmpeg = extract_audio_ffmpeg(audio_file, lang_iso)
-        for audio_file in audio_tracks_ffmpeg:
-            audio_track = MKVTrack(audio_file["output_file"], language=audio_file['language'], default_track=False)
-            selected_tracks.append(audio_track)
-        return selected_tracks
-
-# Extract subtitle tracks from MKV file using pymkv
-def extract_subs(mkv_file, language):
-    selected_tracks = []
-    try:
-        mkv = MKVFile(mkv_file)
-        mkv_tracks = mkv.get_track()
-        sub_tracks = []
-        for track in mkv_tracks:
-            if track.track_type == "subtitles":
-                sub_tracks.append(track)
-        for track in sub_tracks:
-            if track.language:
-                if iso639.Language.match(track.language) == language:
-                    selected_tracks.append(track)
-        
-        return selected_tracks
+        return audio_tracks, sub_tracks
     
     except Exception as e:
-        print(f"Error extracting subtitles from MKV file: {e}")
-        print(f"No subtitles extracted.")
-        return []
+        print(f"Error extracting tracks from MKV file: {e}")
+        print(f"Extracting audio using ffmpeg instead, no subtitles extracted.")
+        from pymkv import MKVTrack
+        audio_tracks = []
+        for track in extract_audio_ffmpeg(mkv_file, language, copy_if_possible=copy_if_possible):
+            audio_track = MKVTrack(track["output_file"], language=track['language'], default_track=False)
+            audio_tracks.append(audio_track)
+        return audio_tracks, []
 
 # Mux extracted audio tracks and sub tracks into video file
+# mkvmerge is called directly with arguments built from the already identified tracks, flags are set through
+# mkvmerge options so the cached files are never modified
 def mux_tracks_with_video(video_file, audio_tracks, sub_tracks, language, output_file):
     if not audio_tracks:
         print("No audio tracks to mux. Exiting.")
         return
-    mkv_video = MKVFile(video_file)
-    mkv_video_tracks = mkv_video.get_track()
-    # Set all existing audio and subtitles tracks to non-default
+    mkv_video = _load_mkv(video_file, _stat_key(video_file))
+    mkvmerge_args = ["-o", output_file]
+    # Set all existing audio and subtitles tracks to non-default, except forced subtitles in preferred language
     found_forced_sub = False
-    for track in mkv_video_tracks:
+    for track in mkv_video.get_track():
         if track.track_type == "audio":
-            track.default_track = False
-            #mkv_video.replace_track(track.track_id, track)
+            mkvmerge_args.extend(["--default-track-flag", f"{track.track_id}:0"])
         if track.track_type == "subtitles":
-            if iso639.Language.match(track.language) == language and track.forced_track:
-                track.default_track = True
-                found_forced_sub = True
-            else:
-                track.default_track = False
-            #mkv_video.replace_track(track.track_id, track)
-    # Add new audio tracks
+            default_track = _lang_match(track.language) == language and track.forced_track
+            found_forced_sub = found_forced_sub or default_track
+            mkvmerge_args.extend(["--default-track-flag", f"{track.track_id}:{int(default_track)}"])
+    mkvmerge_args.append(video_file)
+
+    # Add new audio tracks, the first one as default, then subtitle tracks, grouped by source file
+    added_tracks = {}
     for idx, track in enumerate(audio_tracks):
-        track.default_track = idx == 0  # Set the first added track as default
-        mkv_video.add_track(track)
-    
-    # Add subtitle tracks
+        added_tracks.setdefault(track.file_path, []).append((track, idx == 0))
     for track in sub_tracks:
-        if track.forced_track and not found_forced_sub:
-            track.default_track = True
-        else:
-            track.default_track = False
-        mkv_video.add_track(track)
+        added_tracks.setdefault(track.file_path, []).append((track, track.forced_track and not found_forced_sub))
+    for file_path, file_tracks in added_tracks.items():
+        audio_ids = [f"{track.track_id}" for track, _ in file_tracks if track.track_type == "audio"]
+        sub_ids = [f"{track.track_id}" for track, _ in file_tracks if track.track_type == "subtitles"]
+        mkvmerge_args.extend(["--no-video", "--no-chapters", "--no-global-tags"])
+        # Attachments are kept for files providing subtitles, as ASS/SSA subtitles rely on their attached fonts
+        if not sub_ids:
+            mkvmerge_args.append("--no-attachments")
+        mkvmerge_args.extend(["--audio-tracks", ",".join(audio_ids)] if audio_ids else ["--no-audio"])
+        mkvmerge_args.extend(["--subtitle-tracks", ",".join(sub_ids)] if sub_ids else ["--no-subtitles"])
+        for track, default_track in file_tracks:
+            # BCP 47 tag wins when set, so region and script subtags of source tracks are kept
+            # Relabelled tracks and files extracted by ffmpeg have none and get their ISO 639-2 code
+            track_language = track.language_ietf or track.language
+            if track_language:
+                mkvmerge_args.extend(["--language", f"{track.track_id}:{track_language}"])
+            mkvmerge_args.extend(["--default-track-flag", f"{track.track_id}:{int(default_track)}"])
+        mkvmerge_args.append(file_path)
+    # Arguments are passed through a JSON options file, avoiding command line length limits with many tracks
+    with tempfile.NamedTemporaryFile("w", suffix=".json", delete=False, encoding="utf-8") as options_file:
+        json.dump(mkvmerge_args, options_file)
     try:
-        mkv_video.mux(output_file)
+        subprocess.run(["mkvmerge", f"@{options_file.name}"], check=True)
         print(f"Muxing completed. Output file: {output_file}")
     except Exception as e:
         print(f"Error muxing tracks into MKV file: {e}")
         print("Output might be corrupted or incomplete.")
+    finally:
+        os.remove(options_file.name)
 
 def check_language_in_video(mkv_file, language):
     try:
-        mkv = MKVFile(mkv_file)
-        mkv_tracks = mkv.get_track()
-        for track in mkv_tracks:
-            if track.track_type == "audio" and track.language:
-                if iso639.Language.match(track.language) == language:
-                    return True
-        return False
+        mkv = _load_mkv(mkv_file, _stat_key(mkv_file))
+        return bool(mkv._audio_by_lang.get(language))
     
     except Exception as e:
         print(f"Error checking language in MKV file: {e}")
@@ -201,6 +417,7 @@ if __name__ == "__main__":
     parser.add_argument("-ia", "--input-audio", required=True, help="Input video/audio file from which audio track will be extracted.")
     parser.add_argument("-l", "--language", required=True, help="Preferred language for audio track (ISO 639-2 code or language name).")
     parser.add_argument("-f", "--force", action="store_true", help="Force addition of audio track even if language is already present in video file.")
+    parser.add_argument("-c", "--copy-if-possible", action="store_true", help="Copy audio stream without re-encoding to Matroska audio file when using ffmpeg extraction.")
     args = parser.parse_args()
 
     # Properties from arguments
@@ -208,6 +425,7 @@ if __name__ == "__main__":
     audio_file = args.input_audio
     lang = args.language
     force = args.force
+    copy_if_possible = args.copy_if_possible
 
     # Getting the iso639 language code from user input
     lang_iso = iso639.Language.match(lang)
@@ -215,19 +433,17 @@ if __name__ == "__main__":
         print(f"Language '{lang}' not recognized. Exiting.")
         sys.exit(1)
 
-    # Check first if language is already present in video file
-    if check_language_in_video(video_file, lang_iso):
-        if not force:
-            print(f"Language '{lang_iso.name}' is already present in video file. Exiting.")
-            sys.exit(0)
-        else:
-            print(f"Language '{lang_iso.name}' is already present in video file. Forcing addition of new track.")
+    # Check first if language is already present in video file, skipped when addition is forced
+    if not force and check_language_in_video(video_file, lang_iso):
+        print(f"Language '{lang_iso.name}' is already present in video file. Exiting.")
+        sys.exit(0)
     
-    # Extract audio from file that contains preferred language audio track
-    audio_tracks = extract_audio(audio_file, lang_iso)
-
-    # Extract subtitles from file that might contains preferred language subtitles track as well
-    sub_tracks = extract_subs(audio_file, lang_iso)
+    # Extract audio and subtitles from file that contains preferred language tracks, in a single pass over its tracks
+    # Meanwhile video file is identified for muxing in background, both steps mostly wait on subprocesses
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        if video_file != audio_file:
+            executor.submit(lambda: _load_mkv(video_file, _stat_key(video_file)))
+        audio_tracks, sub_tracks = extract_tracks(audio_file, lang_iso, copy_if_possible)
 
     # Mux extracted audio into video file
     filename, ext = os.path.splitext(video_file)
@@ -1,106 +1,158 @@
 import argparse
+import copy
+import json
 import os
+import subprocess
 import sys
-from pymkv import MKVFile
+import tempfile
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 import iso639
 
-# Extract audio tracks from MKV file using pymkv, fallback to ffmpeg if fails
-def extract_audio(mkv_file, language):
-    selected_tracks = []
+# pymkv is imported where used, so that runs failing on arguments never load it
+
+# Language tags meaning the track language is undetermined
+_UND = frozenset({"und", "", None})
+
+# Key identifying the state of a file on disk, so cached metadata is dropped when the file changes
+def _stat_key(path):
+    return (os.path.getmtime(path), os.path.getsize(path))
+
+# Parse MKV file only once per file state, as each MKVFile construction spawns mkvmerge
+# Tracks are indexed by language in the same pass, so language queries on the cached file are dict lookups
+@lru_cache(maxsize=32)
+def _load_mkv(mkv_file, stat_key):
+    from pymkv import MKVFile
+    mkv = MKVFile(mkv_file)
+    mkv._audio_by_lang = defaultdict(list)
+    mkv._subs_by_lang = defaultdict(list)
+    mkv._und_audio = []
+    for track in mkv.get_track():
+        if track.track_type == "audio":
+            mkv._audio_by_lang[_lang_match(track.language)].append(track)
+            if track.language in _UND:
+                mkv._und_audio.append(track)
+        elif track.track_type == "subtitles":
+            mkv._subs_by_lang[_lang_match(track.language)].append(track)
+    return mkv
+
+# Build static map of iso639 codes to languages, following Language.match priority
+def _build_lang_codes():
+    lang_codes = {}
+    active_languages = [language for language in iso639.ALL_LANGUAGES if language.status == "A"]
+    for part in ("part3", "part2b", "part2t", "part1"):
+        for language in active_languages:
+            code = getattr(language, part)
+            if code:
+                lang_codes.setdefault(code, language)
+    for language in iso639.ALL_LANGUAGES:
+        lang_codes.setdefault(language.part3, language)
+    return lang_codes
+
+_LANG_CODES = _build_lang_codes()
+
+# Match language code to iso639 language, cached as the same few codes are matched for every track
+# Codes found in MKV tags are resolved from the static map, other inputs go through Language.match
+# Codes unknown to iso639 but accepted by mkvmerge (e.g. collective codes like 'sgn') match no language
+@lru_cache(maxsize=256)
+def _lang_match(code):
+    if not code:
+        return None
     try:
-        mkv = MKVFile(mkv_file)
-        mkv_tracks = mkv.get_track()
-        audio_tracks = []
-        for track in mkv_tracks:
-            if track.track_type == "audio":
-                audio_tracks.append(track)
-        for track in audio_tracks:
-            if track.language:
-                if iso639.Language.match(track.language) == language:
-                    selected_tracks.append(track)
-        if not selected_tracks:
-            print(f"No audio tracks found for language '{language.name}'. Assuming tag is missing and exporting the one(s) with 'und' language.")
-            for track in audio_tracks:
-                if track.language == "und" or not track.language:
-                    # Overwritting language to desired one
-                    track.language = language.part2b
-                    selected_tracks.append(track)
-        return selected_tracks
-    
-    except Exception as e:
-        print(f"Error extracting audio from MKV file: {e}")
-        return selected_tracks
+        return _LANG_CODES.get(code) or _LANG_CODES.get(code.lower()) or iso639.Language.match(code)
+    except iso639.LanguageNotFoundError:
+        return None
 
-# Extract subtitle tracks from MKV file using pymkv
-def extract_subs(mkv_file, language):
-    selected_tracks = []
+# Classify MKV file tracks: audio tracks in preferred language (or 'und' ones relabelled as fallback),
+# subtitle tracks in preferred language, and whether audio in preferred language is present
+# Subtitle languages are matched in the same pass as audio ones, so a subtitle code must never fail the audio result
+def classify_tracks(mkv_file, language):
+    mkv = _load_mkv(mkv_file, _stat_key(mkv_file))
+    audio_tracks = [copy.copy(track) for track in mkv._audio_by_lang.get(language, [])]
+    sub_tracks = [copy.copy(track) for track in mkv._subs_by_lang.get(language, [])]
+    has_lang_audio = bool(audio_tracks)
+    if not has_lang_audio:
+        for track in mkv._und_audio:
+            # Overwritting language to desired one, on a copy to keep cached file untouched
+            track = copy.copy(track)
+            track.language = language.part2b
+            track.language_ietf = None
+            audio_tracks.append(track)
+    return audio_tracks, sub_tracks, has_lang_audio
+
+# Extract audio and subtitle tracks from MKV file using pymkv
+def extract_tracks(mkv_file, language):
     try:
-        mkv = MKVFile(mkv_file)
-        mkv_tracks = mkv.get_track()
-        sub_tracks = []
-        for track in mkv_tracks:
-            if track.track_type == "subtitles":
-                sub_tracks.append(track)
-        for track in sub_tracks:
-            if track.language:
-                if iso639.Language.match(track.language) == language:
-                    selected_tracks.append(track)
-        
-        return selected_tracks
+        audio_tracks, sub_tracks, has_lang_audio = classify_tracks(mkv_file, language)
+        if not has_lang_audio:
+            print(f"No audio tracks found for language '{language.name}'. Assuming tag is missing and exporting the one(s) with 'und' language.")
+        return audio_tracks, sub_tracks
     
     except Exception as e:
-        print(f"Error extracting subtitles from MKV file: {e}")
-        print(f"No subtitles extracted.")
-        return []
+        print(f"Error extracting tracks from MKV file: {e}")
+        print(f"No audio or subtitles extracted.")
+        return [], []
 
 # Mux extracted audio tracks and sub tracks into video file
+# mkvmerge is called directly with arguments built from the already identified tracks, flags are set through
+# mkvmerge options so the cached files are never modified
 def mux_tracks_with_video(video_file, audio_tracks, sub_tracks, language, output_file):
     if not audio_tracks:
         print("No audio tracks to mux. Exiting.")
         return
-    mkv_video = MKVFile(video_file)
-    mkv_video_tracks = mkv_video.get_track()
-    # Set all existing audio and subtitles tracks to non-default
+    mkv_video = _load_mkv(video_file, _stat_key(video_file))
+    mkvmerge_args = ["-o", output_file]
+    # Set all existing audio and subtitles tracks to non-default, except forced subtitles in preferred language
     found_forced_sub = False
-    for track in mkv_video_tracks:
+    for track in mkv_video.get_track():
         if track.track_type == "audio":
-            track.default_track = False
-            #mkv_video.replace_track(track.track_id, track)
+            mkvmerge_args.extend(["--default-track-flag", f"{track.track_id}:0"])
         if track.track_type == "subtitles":
-            if iso639.Language.match(track.language) == language and track.forced_track:
-                track.default_track = True
-                found_forced_sub = True
-            else:
-                track.default_track = False
-            #mkv_video.replace_track(track.track_id, track)
-    # Add new audio tracks
+            default_track = _lang_match(track.language) == language and track.forced_track
+            found_forced_sub = found_forced_sub or default_track
+            mkvmerge_args.extend(["--default-track-flag", f"{track.track_id}:{int(default_track)}"])
+    mkvmerge_args.append(video_file)
+
+    # Add new audio tracks, the first one as default, then subtitle tracks, grouped by source file
+    added_tracks = {}
     for idx, track in enumerate(audio_tracks):
-        track.default_track = idx == 0  # Set the first added track as default
-        mkv_video.add_track(track)
-    
-    # Add subtitle tracks
+        added_tracks.setdefault(track.file_path, []).append((track, idx == 0))
     for track in sub_tracks:
-        if track.forced_track and not found_forced_sub:
-            track.default_track = True
-        else:
-            track.default_track = False
-        mkv_video.add_track(track)
+        added_tracks.setdefault(track.file_path, []).append((track, track.forced_track and not found_forced_sub))
+    for file_path, file_tracks in added_tracks.items():
+        audio_ids = [f"{track.track_id}" for track, _ in file_tracks if track.track_type == "audio"]
+        sub_ids = [f"{track.track_id}" for track, _ in file_tracks if track.track_type == "subtitles"]
+        mkvmerge_args.extend(["--no-video", "--no-chapters", "--no-global-tags"])
+        # Attachments are kept for files providing subtitles, as ASS/SSA subtitles rely on their attached fonts
+        if not sub_ids:
+            mkvmerge_args.append("--no-attachments")
+        mkvmerge_args.extend(["--audio-tracks", ",".join(audio_ids)] if audio_ids else ["--no-audio"])
+        mkvmerge_args.extend(["--subtitle-tracks", ",".join(sub_ids)] if sub_ids else ["--no-subtitles"])
+        for track, default_track in file_tracks:
+            # BCP 47 tag wins when set, so region and script subtags of source tracks are kept
+            # Relabelled tracks and files extracted by ffmpeg have none and get their ISO 639-2 code
+            track_language = track.language_ietf or track.language
+            if track_language:
+                mkvmerge_args.extend(["--language", f"{track.track_id}:{track_language}"])
+            mkvmerge_args.extend(["--default-track-flag", f"{track.track_id}:{int(default_track)}"])
+        mkvmerge_args.append(file_path)
+    # Arguments are passed through a JSON options file, avoiding command line length limits with many tracks
+    with tempfile.NamedTemporaryFile("w", suffix=".json", delete=False, encoding="utf-8") as options_file:
+        json.dump(mkvmerge_args, options_file)
     try:
-        mkv_video.mux(output_file)
+        subprocess.run(["mkvmerge", f"@{options_file.name}"], check=True)
         print(f"Muxing completed. Output file: {output_file}")
     except Exception as e:
         print(f"Error muxing tracks into MKV file: {e}")
         print("Output might be corrupted or incomplete.")
+    finally:
+        os.remove(options_file.name)
 
 def check_language_in_video(mkv_file, language):
     try:
-        mkv = MKVFile(mkv_file)
-        mkv_tracks = mkv.get_track()
-        for track in mkv_tracks:
-            if track.track_type == "audio" and track.language:
-                if iso639.Language.match(track.language) == language:
-                    return True
-        return False
+        mkv = _load_mkv(mkv_file, _stat_key(mkv_file))
+        return bool(mkv._audio_by_lang.get(language))
     
     except Exception as e:
         print(f"Error checking language in MKV file: {e}")
@@ -127,19 +179,17 @@ if __name__ == "__main__":
         print(f"Language '{lang}' not recognized. Exiting.")
         sys.exit(1)
 
-    # Check first if language is already present in video file
-    if check_language_in_video(video_file, lang_iso):
-        if not force:
-            print(f"Language '{lang_iso.name}' is already present in video file. Exiting.")
-            sys.exit(0)
-        else:
-            print(f"Language '{lang_iso.name}' is already present in video file. Forcing addition of new track.")
+    # Check first if language is already present in video file, skipped when addition is forced
+    if not force and check_language_in_video(video_file, lang_iso):
+        print(f"Language '{lang_iso.name}' is already present in video file. Exiting.")
+        sys.exit(0)
     
-    # Extract audio from file that contains preferred language audio track
-    audio_tracks = extract_audio(audio_file, lang_iso)
-
-    # Extract subtitles from file that might contains preferred language subtitles track as well
-    sub_tracks = extract_subs(audio_file, lang_iso)
+    # Extract audio and subtitles from file that contains preferred language tracks, in a single pass over its tracks
+    # Meanwhile video file is identified for muxing in background, both steps mostly wait on subprocesses
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        if video_file != audio_file:
+            executor.submit(lambda: _load_mkv(video_file, _stat_key(video_file)))
+        audio_tracks, sub_tracks = extract_tracks(audio_file, lang_iso)
 
     # Mux extracted audio into video file
     filename, ext = os.path.splitext(video_file)